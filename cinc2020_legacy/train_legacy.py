@@ -238,8 +238,8 @@ def train(
         ) as pbar:
             for epoch_step, (signals, labels) in enumerate(train_loader):
                 global_step += 1
-                signals = signals.to(device=device, dtype=_DTYPE)
-                labels = labels.to(device=device, dtype=_DTYPE)
+                signals = signals.to(device=device, dtype=_DTYPE, non_blocking=True)
+                labels = labels.to(device=device, dtype=_DTYPE, non_blocking=True)
 
                 preds = model(signals)
                 loss = criterion(preds, labels)
@@ -406,7 +406,7 @@ def evaluate(
     all_labels = []
 
     for signals, labels in data_loader:
-        signals = signals.to(device=device, dtype=_DTYPE)
+        signals = signals.to(device=device, dtype=_DTYPE, non_blocking=True)
         labels = labels.numpy()
         all_labels.append(labels)
 
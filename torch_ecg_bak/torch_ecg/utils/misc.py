@@ -79,7 +79,7 @@ def get_record_list_recursive(db_dir:str, rec_ext:str) -> List[str]:
             tmp = [os.path.join(r, item) for item in os.listdir(r)]
             res += [item for item in tmp if os.path.isfile(item)]
             new_roots += [item for item in tmp if os.path.isdir(item)]
-        roots = deepcopy(new_roots)
+        roots = new_roots
     res = [os.path.splitext(item)[0].replace(db_dir, "") for item in res if item.endswith(rec_ext)]
     res = sorted(res)
 
@@ -117,7 +117,7 @@ def get_record_list_recursive2(db_dir:str, rec_pattern:str) -> List[str]:
             # res += [item for item in tmp if os.path.isfile(item)]
             res += glob(os.path.join(r, rec_pattern), recursive=False)
             new_roots += [item for item in tmp if os.path.isdir(item)]
-        roots = deepcopy(new_roots)
+        roots = new_roots
     res = [os.path.splitext(item)[0].replace(db_dir, "") for item in res]
     res = sorted(res)
 
@@ -163,7 +163,7 @@ def get_record_list_recursive3(db_dir:str, rec_patterns:Union[str,Dict[str,str]]
                 for k in rec_patterns.keys():
                     res[k] += list(filter(re.compile(rec_patterns[k]).search, tmp))
             new_roots += [item for item in tmp if os.path.isdir(item)]
-        roots = deepcopy(new_roots)
+        roots = new_roots
     if isinstance(rec_patterns, str):
         res = [os.path.splitext(item)[0].replace(db_dir, "") for item in res]
         res = sorted(res)
@@ -414,8 +414,7 @@ def compute_module_size(module:nn.Module, human:bool=False, dtype:str="float32")
     n_params: int,
         size (number of parameters) of this torch module
     """
-    module_parameters = filter(lambda p: p.requires_grad, module.parameters())
-    n_params = sum([np.prod(p.size()) for p in module_parameters])
+    n_params = sum(p.numel() for p in module.parameters() if p.requires_grad)
     if human:
         n_params = n_params * {"float16":2, "float32":4, "float64":8}[dtype.lower()] / 1024
         div_count = 0
@@ -523,7 +522,8 @@ def default_collate_fn(batch:Sequence[Tuple[np.ndarray, ...]]) -> Tuple[Tensor,
     ret = []
     for i in range(n_fields):
         values = [[item[i]] for item in batch]
-        values = np.concatenate(values, axis=0).astype(_DTYPE)
+        # the concatenated array is new, hence no copy is needed if the dtype matches
+        values = np.concatenate(values, axis=0).astype(_DTYPE, copy=False)
         values = torch.from_numpy(values)
         ret.append(values)
     return tuple(ret)
@@ -193,8 +193,8 @@ class CINC2021Trainer(BaseTrainer):
             the labels of the given data
         """
         signals, labels = data
-        signals = signals.to(self.device)
-        labels = labels.to(self.device)
+        signals = signals.to(self.device, non_blocking=True)
+        labels = labels.to(self.device, non_blocking=True)
         preds = self.model(signals)
         return preds, labels
 
@@ -208,7 +208,9 @@ class CINC2021Trainer(BaseTrainer):
         all_labels = []
 
         for signals, labels in data_loader:
-            signals = signals.to(device=self.device, dtype=self.dtype)
+            signals = signals.to(
+                device=self.device, dtype=self.dtype, non_blocking=True
+            )
             labels = labels.numpy()
             all_labels.append(labels)
 
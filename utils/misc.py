@@ -5,11 +5,11 @@ import sys
 import re
 import logging
 import datetime
-from functools import reduce
+import fnmatch
+import hashlib
+from itertools import chain
 from collections import namedtuple
-from glob import glob
-from copy import deepcopy
-from typing import Union, Optional, List, Dict, Sequence, Iterable, Any
+from typing import Union, Optional, List, Dict, Tuple, Sequence, Iterable, Any
 from numbers import Real, Number
 
 import numpy as np
@@ -47,6 +47,28 @@ __all__ = [
 ]
 
 
+_TRUE_STRS = frozenset({"yes", "true", "t", "y", "1"})
+_FALSE_STRS = frozenset({"no", "false", "f", "n", "0"})
+# exact types checked before falling back to `isinstance` in `dict_to_str`
+_FLAT_EXACT_TYPES = frozenset({int, float, bool})
+_DIGITS_PATTERN = re.compile("[\\d]+")
+# cache of the "balanced" class weights in `class_weight_to_sample_weight`,
+# keyed by a digest of the labels (so that the labels themselves are not kept),
+# labels larger than `_BALANCED_WEIGHT_CACHE_MAX_NBYTES` are not cached
+_BALANCED_WEIGHT_CACHE = {}
+_BALANCED_WEIGHT_CACHE_MAX_ENTRIES = 16
+_BALANCED_WEIGHT_CACHE_MAX_NBYTES = 8 * 1024**2
+
+
+
+def _raise_walk_error(err: OSError) -> None:
+    """
+    `onerror` callback of `os.walk`, which by default ignores errors,
+    so that e.g. a non-existing or unreadable `db_dir` raises, as `os.listdir` does
+    """
+    raise err
+
+
 def get_record_list_recursive(db_dir: str, rec_ext: str) -> List[str]:
     """finished, checked,
 
@@ -68,23 +90,16 @@ def get_record_list_recursive(db_dir: str, rec_ext: str) -> List[str]:
     res: list of str,
         list of records, in lexicographical order
     """
+    suffix = rec_ext if rec_ext.startswith(".") else f".{rec_ext}"
+    prefix_len = len(db_dir.rstrip(os.sep)) + 1
     res = []
-    db_dir = os.path.join(db_dir, "tmp").replace(
-        "tmp", ""
-    )  # make sure `db_dir` ends with a sep
-    roots = [db_dir]
-    while len(roots) > 0:
-        new_roots = []
-        for r in roots:
-            tmp = [os.path.join(r, item) for item in os.listdir(r)]
-            res += [item for item in tmp if os.path.isfile(item)]
-            new_roots += [item for item in tmp if os.path.isdir(item)]
-        roots = deepcopy(new_roots)
-    res = [
-        os.path.splitext(item)[0].replace(db_dir, "")
-        for item in res
-        if item.endswith(rec_ext)
-    ]
+    # symbolic links to directories are followed, as `os.path.isdir` does
+    for root, _, files in os.walk(db_dir, onerror=_raise_walk_error, followlinks=True):
+        res += [
+            os.path.join(root, f)[prefix_len : -len(suffix)]
+            for f in files
+            if f.endswith(suffix)
+        ]
     res = sorted(res)
 
     return res
@@ -111,20 +126,18 @@ def get_record_list_recursive2(db_dir: str, rec_pattern: str) -> List[str]:
     res: list of str,
         list of records, in lexicographical order
     """
+    prefix_len = len(db_dir.rstrip(os.sep)) + 1
+    # as `glob`, hidden files (e.g. "._A0001.mat" created by macOS)
+    # are matched only if `rec_pattern` itself starts with "."
+    match_hidden = rec_pattern.startswith(".")
     res = []
-    db_dir = os.path.join(db_dir, "tmp").replace(
-        "tmp", ""
-    )  # make sure `db_dir` ends with a sep
-    roots = [db_dir]
-    while len(roots) > 0:
-        new_roots = []
-        for r in roots:
-            tmp = [os.path.join(r, item) for item in os.listdir(r)]
-            # res += [item for item in tmp if os.path.isfile(item)]
-            res += glob(os.path.join(r, rec_pattern), recursive=False)
-            new_roots += [item for item in tmp if os.path.isdir(item)]
-        roots = deepcopy(new_roots)
-    res = [os.path.splitext(item)[0].replace(db_dir, "") for item in res]
+    # symbolic links to directories are followed, as `os.path.isdir` does
+    for root, _, files in os.walk(db_dir, onerror=_raise_walk_error, followlinks=True):
+        res += [
+            os.path.splitext(os.path.join(root, f))[0][prefix_len:]
+            for f in fnmatch.filter(files, rec_pattern)
+            if match_hidden or not f.startswith(".")
+        ]
     res = sorted(res)
 
     return res
@@ -147,7 +160,15 @@ def get_record_list_recursive3(
         the parent (root) path of the whole database
     rec_patterns: str or dict,
         pattern of the record filenames, e.g. "A(?:\d+).mat",
-        or patterns of several subsets, e.g. `{"A": "A(?:\d+).mat"}`
+        or patterns of several subsets, e.g. `{"A": "A(?:\d+).mat"}`,
+        in the latter case, the patterns are fused into one regular expression,
+        and each filename is assigned to (at most) one subset,
+        that of the leftmost match in the filename
+        (ties at the same position go to the subset listed first),
+        hence a filename matched by several (overlapping) patterns
+        is NOT put into every subset it matches,
+        e.g. with `{"A": "1", "B": "x"}`, "x1.mat" goes to "B" only;
+        the patterns should not use numbered backreferences
 
     Returns
     -------
@@ -156,37 +177,37 @@ def get_record_list_recursive3(
     """
     if isinstance(rec_patterns, str):
         res = []
+        pattern = re.compile(rec_patterns)
     elif isinstance(rec_patterns, dict):
         res = {k: [] for k in rec_patterns.keys()}
-    db_dir = os.path.join(db_dir, "tmp").replace(
-        "tmp", ""
-    )  # make sure `db_dir` ends with a sep
+        # one named group for each subset, so that each filename is scanned only once
+        group_to_key = {f"g{idx}": k for idx, k in enumerate(rec_patterns.keys())}
+        fused_pattern = re.compile(
+            "|".join(f"(?P<{g}>{rec_patterns[k]})" for g, k in group_to_key.items())
+        )
+    db_dir = os.path.join(os.fspath(db_dir), "")  # make sure `db_dir` ends with a sep
+    prefix_len = len(db_dir)
     roots = [db_dir]
     while len(roots) > 0:
         new_roots = []
         for r in roots:
-            tmp = os.listdir(r)
-            # tmp = [os.path.join(r, item) for item in os.listdir(r)]
-            # res += [item for item in tmp if os.path.isfile(item)]
+            with os.scandir(r) as it:
+                tmp = list(it)
             if isinstance(rec_patterns, str):
-                to_add = list(filter(re.compile(rec_patterns).search, tmp))
-                res += [os.path.join(r, item) for item in to_add]
+                res += [entry.path for entry in tmp if pattern.search(entry.name)]
             elif isinstance(rec_patterns, dict):
-                for k in rec_patterns.keys():
-                    to_add = list(filter(re.compile(rec_patterns[k]).search, tmp))
-                    res[k] += [os.path.join(r, item) for item in to_add]
-            new_roots += [
-                os.path.join(r, item)
-                for item in tmp
-                if os.path.isdir(os.path.join(r, item))
-            ]
-        roots = deepcopy(new_roots)
+                for entry in tmp:
+                    matched = fused_pattern.search(entry.name)
+                    if matched:
+                        res[group_to_key[matched.lastgroup]].append(entry.path)
+            new_roots += [entry.path for entry in tmp if entry.is_dir()]
+        roots = new_roots
     if isinstance(rec_patterns, str):
-        res = [os.path.splitext(item)[0].replace(db_dir, "") for item in res]
+        res = [os.path.splitext(item)[0][prefix_len:] for item in res]
         res = sorted(res)
     elif isinstance(rec_patterns, dict):
         for k in rec_patterns.keys():
-            res[k] = [os.path.splitext(item)[0].replace(db_dir, "") for item in res[k]]
+            res[k] = [os.path.splitext(item)[0][prefix_len:] for item in res[k]]
             res[k] = sorted(res[k])
     return res
 
@@ -213,64 +234,72 @@ def dict_to_str(
     s: str,
         the formatted string
     """
+    parts = []
+    _dict_to_str(d, current_depth, indent_spaces, parts)
+    return "".join(parts)
+
+
+def _dict_to_str(
+    d: Union[dict, list, tuple],
+    current_depth: int,
+    indent_spaces: int,
+    parts: List[str],
+) -> None:
+    """finished, checked,
+
+    recursive part of `dict_to_str`,
+    the fragments of the formatted string are appended to `parts`,
+    to avoid repeated concatenation of (long) strings
+    """
     assert isinstance(d, (dict, list, tuple))
     if len(d) == 0:
-        s = f"{{}}" if isinstance(d, dict) else "[]"  # noqa: F541
-        return s
+        parts.append("{}" if isinstance(d, dict) else "[]")
+        return
     # flat_types = (Number, bool, str,)
     flat_types = (
         Number,
         bool,
     )
     flat_sep = ", "
-    s = "\n"
     unit_indent = " " * indent_spaces
     prefix = unit_indent * current_depth
+    parts.append("{\n" if isinstance(d, dict) else "[\n")
     if isinstance(d, (list, tuple)):
-        if all([isinstance(v, flat_types) for v in d]):
+        if all(type(v) in _FLAT_EXACT_TYPES or isinstance(v, flat_types) for v in d):
             len_per_line = 110
             current_len = len(prefix) + 1  # + 1 for a comma
             val = []
-            for idx, v in enumerate(d):
-                add_v = f"\042{v}\042" if isinstance(v, str) else str(v)
+            # `str` is not in `flat_types`, hence no quoting is needed here
+            for add_v in map(str, d):
                 add_len = len(add_v) + len(flat_sep)
                 if current_len + add_len > len_per_line:
-                    val = ", ".join([item for item in val])
-                    s += f"{prefix}{val},\n"
+                    parts.append(f"{prefix}{flat_sep.join(val)},\n")
                     val = [add_v]
                     current_len = len(prefix) + 1 + len(add_v)
                 else:
                     val.append(add_v)
                     current_len += add_len
             if len(val) > 0:
-                val = ", ".join([item for item in val])
-                s += f"{prefix}{val}\n"
+                parts.append(f"{prefix}{flat_sep.join(val)}\n")
         else:
             for idx, v in enumerate(d):
+                parts.append(prefix)
                 if isinstance(v, (dict, list, tuple)):
-                    s += f"{prefix}{dict_to_str(v, current_depth+1)}"
-                else:
-                    val = f"\042{v}\042" if isinstance(v, str) else v
-                    s += f"{prefix}{val}"
-                if idx < len(d) - 1:
-                    s += ",\n"
+                    _dict_to_str(v, current_depth + 1, indent_spaces, parts)
                 else:
-                    s += "\n"
+                    parts.append(f"\042{v}\042" if isinstance(v, str) else f"{v}")
+                parts.append(",\n" if idx < len(d) - 1 else "\n")
     elif isinstance(d, dict):
         for idx, (k, v) in enumerate(d.items()):
             key = f"\042{k}\042" if isinstance(k, str) else k
+            parts.append(f"{prefix}{key}: ")
             if isinstance(v, (dict, list, tuple)):
-                s += f"{prefix}{key}: {dict_to_str(v, current_depth+1)}"
-            else:
-                val = f"\042{v}\042" if isinstance(v, str) else v
-                s += f"{prefix}{key}: {val}"
-            if idx < len(d) - 1:
-                s += ",\n"
+                _dict_to_str(v, current_depth + 1, indent_spaces, parts)
             else:
-                s += "\n"
-    s += unit_indent * (current_depth - 1)
-    s = f"{{{s}}}" if isinstance(d, dict) else f"[{s}]"
-    return s
+                parts.append(f"\042{v}\042" if isinstance(v, str) else f"{v}")
+            parts.append(",\n" if idx < len(d) - 1 else "\n")
+    parts.append(unit_indent * (current_depth - 1))
+    parts.append("}" if isinstance(d, dict) else "]")
 
 
 def str2bool(v: Union[str, bool]) -> bool:
@@ -293,17 +322,20 @@ def str2bool(v: Union[str, bool]) -> bool:
     https://stackoverflow.com/questions/15008758/parsing-boolean-values-with-argparse
     """
     if isinstance(v, bool):
-        b = v
-    elif v.lower() in ("yes", "true", "t", "y", "1"):
+        return v
+    lv = v.lower()
+    if lv in _TRUE_STRS:
         b = True
-    elif v.lower() in ("no", "false", "f", "n", "0"):
+    elif lv in _FALSE_STRS:
         b = False
     else:
         raise ValueError("Boolean value expected.")
     return b
 
 
-def diff_with_step(a: np.ndarray, step: int = 1, **kwargs) -> np.ndarray:
+def diff_with_step(
+    a: np.ndarray, step: int = 1, out: Optional[np.ndarray] = None, **kwargs
+) -> np.ndarray:
     """finished, checked,
 
     compute a[n+step] - a[n] for all valid n
@@ -314,18 +346,22 @@ def diff_with_step(a: np.ndarray, step: int = 1, **kwargs) -> np.ndarray:
         the input data
     step: int, default 1,
         the step to compute the difference
+    out: ndarray, optional,
+        buffer to store the result, so that it can be reused across calls,
+        should be of shape `(a.shape[0] - step,) + a.shape[1:]`,
+        if not given, a new array is allocated
     kwargs: dict,
 
     Returns
     -------
     d: ndarray:
-        the difference array
+        the difference array (`out` if it is given),
+        difference is taken along the first axis of `a`
     """
-    if step >= len(a):
-        raise ValueError(
-            f"step ({step}) should be less than the length ({len(a)}) of `a`"
-        )
-    d = a[step:] - a[:-step]
+    n = a.shape[0]
+    if step >= n:
+        raise ValueError(f"step ({step}) should be less than the length ({n}) of `a`")
+    d = np.subtract(a[step:], a[:-step], out=out)
     return d
 
 
@@ -400,19 +436,27 @@ def get_mask(
     Returns
     -------
     mask: ndarray or list,
+        the mask (of dtype int8) or the list of intervals
     """
     if isinstance(shape, int):
         shape = (shape,)
-    l_itv = [
-        [max(0, cp - left_bias), min(shape[-1], cp + right_bias)]
-        for cp in critical_points
-    ]
+    # the dtype is kept, so that e.g. float critical points give float intervals
+    cp = np.asarray(critical_points)
+    if cp.size == 0:
+        cp = cp.astype(int)  # e.g. `[]`, which is converted to a float array
+    starts = np.maximum(0, cp - left_bias)
+    ends = np.minimum(shape[-1], cp + right_bias)
     if return_fmt.lower() == "mask":
-        mask = np.zeros(shape=shape, dtype=int)
-        for itv in l_itv:
-            mask[..., itv[0] : itv[1]] = 1
+        # difference array along the last axis: +1 at interval starts, -1 at ends,
+        # its cumulative sum is positive exactly inside (the union of) the intervals
+        valid = starts < ends
+        delta = np.zeros(shape=shape[-1] + 1, dtype=int)
+        np.add.at(delta, starts[valid], 1)
+        np.add.at(delta, ends[valid], -1)
+        mask = np.zeros(shape=shape, dtype=np.int8)
+        mask[...] = np.cumsum(delta[:-1]) > 0
     elif return_fmt.lower() == "intervals":
-        mask = l_itv
+        mask = np.column_stack((starts, ends)).tolist()
     return mask
 
 
@@ -447,16 +491,55 @@ def class_weight_to_sample_weight(
         ), "if `y` are of type str, then class_weight should be 'balanced' or a dict"
 
     if isinstance(class_weight, str) and class_weight.lower() == "balanced":
-        classes = np.unique(y).tolist()
-        cw = compute_class_weight("balanced", classes=classes, y=y)
-        trans_func = lambda s: cw[classes.index(s)]
+        if (
+            isinstance(y, np.ndarray)
+            and not y.dtype.hasobject
+            and y.nbytes <= _BALANCED_WEIGHT_CACHE_MAX_NBYTES
+        ):
+            classes, cw = _balanced_class_weight(y)
+        else:
+            classes = np.unique(y)
+            cw = compute_class_weight("balanced", classes=classes, y=y)
+        # `np.unique` returns sorted classes, hence `searchsorted` gives the class indices
+        sample_weight = cw[np.searchsorted(classes, y)]
+    elif isinstance(class_weight, dict):
+        try:
+            classes = np.unique(sample_weight)
+        except TypeError:  # labels not sortable
+            sample_weight = np.vectorize(lambda s: class_weight[s])(sample_weight)
+        else:
+            lut = np.array([class_weight[c] for c in classes.tolist()])
+            sample_weight = lut[np.searchsorted(classes, sample_weight)]
     else:
-        trans_func = lambda s: class_weight[s]
-    sample_weight = np.vectorize(trans_func)(sample_weight)
+        sample_weight = np.asarray(class_weight)[sample_weight]
     sample_weight = sample_weight / np.max(sample_weight)
     return sample_weight
 
 
+def _balanced_class_weight(y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """finished, checked,
+
+    cached computation of the sorted classes and the "balanced" class weight
+    of the labels `y` (ndarray of non-object dtype),
+    the returned arrays are read-only since they are shared among calls
+    """
+    y = np.ascontiguousarray(y)
+    # the buffer of `y` is hashed directly, without copying it into bytes
+    key = (hashlib.blake2b(y, digest_size=16).digest(), y.shape, y.dtype.str)
+    cached = _BALANCED_WEIGHT_CACHE.get(key, None)
+    if cached is not None:
+        return cached
+    classes = np.unique(y)
+    cw = compute_class_weight("balanced", classes=classes, y=y)
+    classes.flags.writeable = False
+    cw.flags.writeable = False
+    if len(_BALANCED_WEIGHT_CACHE) >= _BALANCED_WEIGHT_CACHE_MAX_ENTRIES:
+        # evict the oldest entry
+        _BALANCED_WEIGHT_CACHE.pop(next(iter(_BALANCED_WEIGHT_CACHE)))
+    _BALANCED_WEIGHT_CACHE[key] = (classes, cw)
+    return classes, cw
+
+
 def plot_single_lead(
     t: np.ndarray,
     sig: np.ndarray,
@@ -470,8 +553,10 @@ def plot_single_lead(
     ----------
     to write
     """
-    if "plt" not in dir():
-        import matplotlib.pyplot as plt
+    # imported lazily since matplotlib is only needed for plotting,
+    # after the first call, this is merely a lookup in `sys.modules`
+    import matplotlib.pyplot as plt
+
     palette = {
         "p_waves": "green",
         "qrs": "red",
@@ -578,7 +663,8 @@ def get_date_str(fmt: Optional[str] = None):
     Parameters
     ----------
     fmt: str, optional,
-        format of the string of date
+        format of the string of date,
+        defaults to "%Y-%m-%d-%H-%M"
 
     Returns
     -------
@@ -586,7 +672,12 @@ def get_date_str(fmt: Optional[str] = None):
         current time in the `str` format
     """
     now = datetime.datetime.now()
-    date_str = now.strftime(fmt or "%Y-%m-%d-%H-%M")
+    if not fmt:
+        # equivalent to `now.strftime("%Y-%m-%d-%H-%M")`, but faster
+        # "YYYY-MM-DDTHH:MM" -> "YYYY-MM-DD-HH-MM"
+        date_str = now.isoformat(timespec="minutes").replace("T", "-").replace(":", "-")
+        return date_str
+    date_str = now.strftime(fmt)
     return date_str
 
 
@@ -615,24 +706,27 @@ def rdheader(header_data: Union[str, Sequence[str]]) -> Union[Record, MultiRecor
         with open(_header_data, "r") as f:
             _header_data = f.read().splitlines()
     else:
-        _header_data = deepcopy(header_data)
+        _header_data = list(header_data)
     # Read the header file. Separate comment and non-comment lines
     header_lines, comment_lines = [], []
+    add_header_line, add_comment_line = header_lines.append, comment_lines.append
     for line in _header_data:
         striped_line = line.strip()
+        if not striped_line:
+            continue
         # Comment line
-        if striped_line.startswith("#"):
-            comment_lines.append(striped_line)
+        if striped_line[0] == "#":
+            add_comment_line(striped_line)
+            continue
         # Non-empty non-comment line = header line.
-        elif striped_line:
-            # Look for a comment in the line
+        # Look for a comment in the line, most header lines have none
+        if "#" in striped_line:
             ci = striped_line.find("#")
-            if ci > 0:
-                header_lines.append(striped_line[:ci])
-                # comment on same line as header line
-                comment_lines.append(striped_line[ci:])
-            else:
-                header_lines.append(striped_line)
+            add_header_line(striped_line[:ci])
+            # comment on same line as header line
+            add_comment_line(striped_line[ci:])
+        else:
+            add_header_line(striped_line)
 
     # Get fields from record line
     record_fields = _header._parse_record_line(header_lines[0])
@@ -731,7 +825,7 @@ def masks_to_waveforms(
         ]:
             _masks = masks.T
         else:
-            _masks = masks.copy()
+            _masks = masks  # read only, no need to copy
     else:
         raise ValueError(
             f"masks should be of dim 1 or 2, but got a {masks.ndim}d array"
@@ -742,38 +836,43 @@ def masks_to_waveforms(
     )
     assert len(_leads) == _masks.shape[0]
 
-    _class_map = ED(deepcopy(class_map))
+    # names of the waves to extract, keyed by their numbers in the masks
+    number_to_name = {
+        wave_number: wave_name.lower()
+        for wave_name, wave_number in class_map.items()
+        if wave_name.lower() in ["pwave", "qrs", "twave"]
+    }
+    wave_numbers = list(number_to_name)
 
-    waves = ED({lead_name: [] for lead_name in _leads})
+    # plain dict while filling, wrapped into an `EasyDict` once at return
+    waves = {lead_name: [] for lead_name in _leads}
     for channel_idx, lead_name in enumerate(_leads):
         current_mask = _masks[channel_idx, ...]
-        for wave_name, wave_number in _class_map.items():
-            if wave_name.lower() not in [
-                "pwave",
-                "qrs",
-                "twave",
-            ]:
-                continue
-            current_wave_inds = np.where(current_mask == wave_number)[0]
-            if len(current_wave_inds) == 0:
-                continue
-            np.where(np.diff(current_wave_inds) > 1)
-            split_inds = np.where(np.diff(current_wave_inds) > 1)[0].tolist()
-            split_inds = sorted(split_inds + [i + 1 for i in split_inds])
-            split_inds = [0] + split_inds + [len(current_wave_inds) - 1]
-            for i in range(len(split_inds) // 2):
-                itv_start = current_wave_inds[split_inds[2 * i]]
-                itv_end = current_wave_inds[split_inds[2 * i + 1]] + 1
-                w = ECGWaveForm(
-                    name=wave_name.lower(),
-                    onset=itv_start,
-                    offset=itv_end,
-                    peak=np.nan,
-                    duration=1000 * (itv_end - itv_start) / fs,  # ms
-                )
-                waves[lead_name].append(w)
-        waves[lead_name].sort(key=lambda w: w.onset)
-    return waves
+        if len(current_mask) == 0:
+            continue
+        # runs of constant values of the mask, found in one pass,
+        # hence the waveforms are in the order of their onsets
+        change_inds = np.flatnonzero(current_mask[1:] != current_mask[:-1]) + 1
+        onsets = np.concatenate(([0], change_inds))
+        offsets = np.concatenate((change_inds, [len(current_mask)]))
+        run_values = current_mask[onsets]
+        is_wave = np.isin(run_values, wave_numbers)
+        onsets = onsets[is_wave]
+        offsets = offsets[is_wave]
+        run_values = run_values[is_wave]
+        durations = 1000 * (offsets - onsets) / fs  # ms
+        waves[lead_name] = [
+            ECGWaveForm._make(
+                (number_to_name[wave_number], itv_start, itv_end, np.nan, duration)
+            )
+            for wave_number, itv_start, itv_end, duration in zip(
+                run_values.tolist(),
+                onsets.tolist(),
+                offsets.tolist(),
+                durations.tolist(),
+            )
+        ]
+    return ED(waves)
 
 
 def mask_to_intervals(
@@ -795,8 +894,9 @@ def mask_to_intervals(
         or the intervals corr. to `vals` if `vals` is int.
         each interval is of the form `[a,b]`, left inclusive, right exclusive
     """
+    arr = np.ascontiguousarray(mask)
     if vals is None:
-        _vals = list(set(mask))
+        _vals = np.unique(arr).tolist()
     elif isinstance(vals, int):
         _vals = [vals]
     else:
@@ -805,19 +905,14 @@ def mask_to_intervals(
 
     intervals = {v: [] for v in _vals}
     for v in _vals:
-        valid_inds = np.where(np.array(mask) == v)[0]
-        if len(valid_inds) == 0:
+        is_v = arr == v
+        if not is_v.any():
             continue
-        split_indices = np.where(np.diff(valid_inds) > 1)[0]
-        split_indices = split_indices.tolist() + (split_indices + 1).tolist()
-        split_indices = sorted([0] + split_indices + [len(valid_inds) - 1])
-        for idx in range(len(split_indices) // 2):
-            intervals[v].append(
-                [
-                    valid_inds[split_indices[2 * idx]],
-                    valid_inds[split_indices[2 * idx + 1]] + 1,
-                ]
-            )
+        # runs of `v` start at 1 and end at -1 of the padded difference
+        d = np.diff(np.concatenate(([0], is_v.view(np.int8), [0])))
+        starts = np.flatnonzero(d == 1)
+        ends = np.flatnonzero(d == -1)
+        intervals[v] = [list(itv) for itv in zip(starts.tolist(), ends.tolist())]
 
     if isinstance(vals, int):
         intervals = intervals[vals]
@@ -851,7 +946,7 @@ def list_sum(lst: Sequence[list]) -> list:
         sum of `lst`,
         i.e. if lst = [list1, list2, ...], then l_sum = list1 + list2 + ...
     """
-    l_sum = reduce(lambda a, b: a + b, lst, [])
+    l_sum = list(chain.from_iterable(lst))
     return l_sum
 
 
@@ -880,25 +975,23 @@ def read_log_txt(
     summary: DataFrame,
         scalars summary, in the format of a pandas DataFrame
     """
-    with open(fp, "r") as f:
-        content = f.read().splitlines()
-    if isinstance(scalar_startswith, str):
-        field_pattern = f"^({scalar_startswith})"
-    else:
-        field_pattern = f"""^({"|".join(scalar_startswith)})"""
+    if not isinstance(scalar_startswith, str):
+        scalar_startswith = "|".join(scalar_startswith)
+    # captures the field name (before the first colon) and the value
+    field_pattern = re.compile(f"^((?:{scalar_startswith})[^:]*):(.*)")
     summary = []
     new_line = None
-    for line in content:
-        if line.startswith(epoch_startswith):
-            if new_line:
-                summary.append(new_line)
-            epoch = re.findall("[\\d]+", line)[0]
-            new_line = {"epoch": epoch}
-        if re.findall(field_pattern, line):
-            field, val = line.split(":")
-            field = field.strip()
-            val = float(val.strip())
-            new_line[field] = val
+    # iterate over the lines without loading the whole (possibly large) file
+    with open(fp, "r") as f:
+        for line in f:
+            if line.startswith(epoch_startswith):
+                if new_line:
+                    summary.append(new_line)
+                epoch = _DIGITS_PATTERN.findall(line)[0]
+                new_line = {"epoch": epoch}
+            matched = field_pattern.match(line)
+            if matched:
+                new_line[matched.group(1).strip()] = float(matched.group(2))
     summary.append(new_line)
     summary = pd.DataFrame(summary)
     return summary
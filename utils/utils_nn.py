@@ -1,9 +1,9 @@
 """
 utilities for nn models
 """
-from itertools import repeat
-from math import floor
-from typing import Union, Sequence, List, Tuple, Optional
+import operator
+from functools import lru_cache
+from typing import Union, Sequence, List, Tuple, Optional, Callable
 
 import numpy as np
 
@@ -31,6 +31,7 @@ __all__ = [
     "compute_avgpool_output_shape",
     "compute_module_size",
     "default_collate_fn",
+    "make_collate_fn",
     "compute_receptive_field",
 ]
 
@@ -57,29 +58,93 @@ def extend_predictions(
     -------
     extended_preds: ndarray,
         the extended array of predictions, with indices in `extended_classes`,
-        of shape (n_records, n_classes), or (n_classes,)
+        of shape (n_records, n_classes), or (n_classes,),
+        and of the same dtype as `preds`
     """
-    _preds = np.atleast_2d(preds)
+    # `preds` is converted only once (no copy if it is already an ndarray)
+    arr = np.asarray(preds)
+    was_1d = arr.ndim == 1
+    _preds = arr[np.newaxis, :] if was_1d else arr
     assert _preds.shape[1] == len(
         classes
     ), f"`pred` indicates {_preds.shape[1]} classes, while `classes` has {len(classes)}"
+    # indices of `classes` in `extended_classes`,
+    # the first occurrence is taken in case of duplicates, as `list.index` does
+    idx_map = {}
+    for idx, c in enumerate(extended_classes):
+        idx_map.setdefault(c, idx)
+    missing = [c for c in classes if c not in idx_map]
     assert (
-        len(set(classes) - set(extended_classes)) == 0
-    ), f"`extended_classes` is not a superset of `classes`, with {set(classes)-set(extended_classes)} in `classes` but not in `extended_classes`"
-
-    extended_preds = np.zeros((_preds.shape[0], len(extended_classes)))
-
-    for idx, c in enumerate(classes):
-        new_idx = extended_classes.index(c)
-        extended_preds[..., new_idx] = _preds[..., idx]
+        len(missing) == 0
+    ), f"`extended_classes` is not a superset of `classes`, with {set(missing)} in `classes` but not in `extended_classes`"
+    new_idx = np.fromiter(
+        (idx_map[c] for c in classes), dtype=np.intp, count=len(classes)
+    )
+    extended_preds = np.zeros(
+        (_preds.shape[0], len(extended_classes)), dtype=_preds.dtype
+    )
+    if len(new_idx) > 0 and (np.diff(new_idx) == 1).all():
+        # `classes` is a contiguous block of `extended_classes` (e.g. the same list),
+        # in which case the scatter reduces to a (much cheaper) slice assignment
+        extended_preds[:, new_idx[0] : new_idx[-1] + 1] = _preds
+    else:
+        extended_preds[:, new_idx] = _preds
 
-    if np.array(preds).ndim == 1:
+    if was_1d:
         extended_preds = extended_preds[0]
 
     return extended_preds
 
 
 # utils for computing output shape
+# layer type (lower case, without underscores) -> category of the layer
+_LAYER_TYPE_CATEGORIES = {
+    alias: category
+    for category, aliases in {
+        "conv": ["conv", "convolution"],
+        "maxpool": ["maxpool", "maxpooling"],
+        "avgpool": ["avgpool", "avgpooling", "averagepool", "averagepooling"],
+        "deconv": ["deconv", "deconvolution", "transposeconv", "transposeconvolution"],
+    }.items()
+    for alias in aliases
+}
+# exact spellings (the above, and their snake_case forms) -> category of the layer,
+# looked up before normalizing the layer type
+_LAYER_TYPE_ALIASES = dict(_LAYER_TYPE_CATEGORIES)
+_LAYER_TYPE_ALIASES.update(
+    {
+        alias: _LAYER_TYPE_CATEGORIES[alias.replace("_", "")]
+        for alias in [
+            "max_pool",
+            "max_pooling",
+            "avg_pool",
+            "avg_pooling",
+            "average_pool",
+            "average_pooling",
+            "de_conv",
+            "de_convolution",
+            "transpose_conv",
+            "transpose_convolution",
+        ]
+    }
+)
+# term subtracted from the padded input length, as function of dilation, kernel_size,
+# for the non-transpose layers
+_MINUS_TERMS = {
+    "conv": lambda d, k: d * (k - 1) + 1,
+    "maxpool": lambda d, k: d * (k - 1) + 1,
+    "avgpool": lambda d, k: k,
+}
+
+
+@lru_cache(maxsize=256)
+def _broadcast(v: int, dim: int) -> Tuple[int, ...]:
+    """
+    broadcast the int parameter `v` (kernel size, stride, etc.) to `dim` dimensions
+    """
+    return (v,) * dim
+
+
 def compute_output_shape(
     layer_type: str,
     input_shape: Sequence[Union[int, type(None)]],
@@ -128,50 +193,51 @@ def compute_output_shape(
     ----------
     [1] https://discuss.pytorch.org/t/utility-function-for-calculating-the-shape-of-a-conv-output/11173/5
     """
-    __TYPES__ = [
-        "conv",
-        "convolution",
-        "deconv",
-        "deconvolution",
-        "transposeconv",
-        "transposeconvolution",
-        "maxpool",
-        "maxpooling",
-        "avgpool",
-        "avgpooling",
-        "averagepool",
-        "averagepooling",
+    # integer scalars (python, numpy, 0-d arrays, etc.) are converted to int,
+    # sequences to tuples of int, so that the arguments are hashable,
+    # `operator.index` rejects non-integers (e.g. float) with TypeError
+    kernel_size, stride, padding, output_padding, dilation = [
+        operator.index(v) if np.ndim(v) == 0 else tuple(map(operator.index, v))
+        for v in [kernel_size, stride, padding, output_padding, dilation]
     ]
-    lt = "".join(layer_type.lower().split("_"))
-    assert lt in __TYPES__
-    if lt in [
-        "conv",
-        "convolution",
-    ]:
-        # as function of dilation, kernel_size
-        minus_term = lambda d, k: d * (k - 1) + 1
+    return _compute_output_shape(
+        layer_type,
+        tuple(input_shape),
+        num_filters,
+        kernel_size,
+        stride,
+        padding,
+        output_padding,
+        dilation,
+        channel_last,
+    )
+
+
+@lru_cache(maxsize=4096)
+def _compute_output_shape(
+    layer_type: str,
+    input_shape: Tuple[Union[int, type(None)], ...],
+    num_filters: Optional[int],
+    kernel_size: Union[Tuple[int, ...], int],
+    stride: Union[Tuple[int, ...], int],
+    padding: Union[Tuple[int, ...], int],
+    output_padding: Union[Tuple[int, ...], int],
+    dilation: Union[Tuple[int, ...], int],
+    channel_last: bool,
+) -> Tuple[Union[int, type(None)]]:
+    """
+    cached implementation of `compute_output_shape`,
+    with all the arguments hashable (sequences converted to tuples)
+    """
+    category = _LAYER_TYPE_ALIASES.get(layer_type, None)
+    if category is None:
+        lt = layer_type.lower().replace("_", "")
+        assert lt in _LAYER_TYPE_CATEGORIES
+        category = _LAYER_TYPE_CATEGORIES[lt]
+    if category in ["conv", "deconv"]:
         out_channels = num_filters
-    elif lt in [
-        "maxpool",
-        "maxpooling",
-    ]:
-        minus_term = lambda d, k: d * (k - 1) + 1
-        out_channels = input_shape[-1] if channel_last else input_shape[1]
-    elif lt in [
-        "avgpool",
-        "avgpooling",
-        "averagepool",
-        "averagepooling",
-    ]:
-        minus_term = lambda d, k: k
+    else:
         out_channels = input_shape[-1] if channel_last else input_shape[1]
-    elif lt in [
-        "deconv",
-        "deconvolution",
-        "transposeconv",
-        "transposeconvolution",
-    ]:
-        out_channels = num_filters
     dim = len(input_shape) - 2
     assert (
         dim > 0
@@ -184,86 +250,66 @@ def compute_output_shape(
     #     assert all([n is not None for n in input_shape[2:]]), none_dim_msg
     none_dim_msg = "spatial dimensions should be all `None`, or all not `None`"
     if channel_last:
-        if all([n is None for n in input_shape[1:-1]]):
-            if out_channels is None:
-                raise ValueError(
-                    "out channel dimension and spatial dimensions are all `None`"
-                )
-            output_shape = tuple(list(input_shape[:-1]) + [out_channels])
-            return output_shape
-        elif any([n is None for n in input_shape[1:-1]]):
-            raise ValueError(none_dim_msg)
+        spatial = input_shape[1:-1]
     else:
-        if all([n is None for n in input_shape[2:]]):
-            if out_channels is None:
-                raise ValueError(
-                    "out channel dimension and spatial dimensions are all `None`"
-                )
-            output_shape = tuple([input_shape[0], out_channels] + list(input_shape[2:]))
-            return output_shape
-        elif any([n is None for n in input_shape[2:]]):
+        spatial = input_shape[2:]
+    # the spatial dimensions are concrete in the common case,
+    # which is checked by a single containment test
+    if None in spatial:
+        if not all(n is None for n in spatial):
             raise ValueError(none_dim_msg)
+        if out_channels is None:
+            raise ValueError(
+                "out channel dimension and spatial dimensions are all `None`"
+            )
+        if channel_last:
+            output_shape = input_shape[:-1] + (out_channels,)
+        else:
+            output_shape = (input_shape[0], out_channels) + spatial
+        return output_shape
+
+    # fast path for the (most common) 1d layers with scalar parameters
+    if dim == 1 and all(
+        isinstance(v, int)
+        for v in [kernel_size, stride, padding, output_padding, dilation]
+    ):
+        i = spatial[0]
+        if category == "deconv":
+            length = (
+                (i - 1) * stride
+                - 2 * padding
+                + dilation * (kernel_size - 1)
+                + output_padding
+                + 1
+            )
+        else:
+            length = (
+                i + 2 * padding - _MINUS_TERMS[category](dilation, kernel_size)
+            ) // stride + 1
+        if channel_last:
+            output_shape = (input_shape[0], length, out_channels)
+        else:
+            output_shape = (input_shape[0], out_channels, length)
+        return output_shape
+
+    _kernel_size, _stride, _padding, _output_padding, _dilation = [
+        _broadcast(v, dim) if isinstance(v, int) else tuple(v)
+        for v in [kernel_size, stride, padding, output_padding, dilation]
+    ]
+    for name, v in zip(
+        ["kernel", "stride", "padding", "output_padding", "dilation"],
+        [_kernel_size, _stride, _padding, _output_padding, _dilation],
+    ):
+        if len(v) != dim:
+            raise ValueError(
+                f"input has {dim} dimensions, while {name} has {len(v)} dimensions, both not including the channel dimension"
+            )
 
-    if isinstance(kernel_size, int):
-        _kernel_size = list(repeat(kernel_size, dim))
-    elif len(kernel_size) == dim:
-        _kernel_size = kernel_size
-    else:
-        raise ValueError(
-            f"input has {dim} dimensions, while kernel has {len(kernel_size)} dimensions, both not including the channel dimension"
-        )
-
-    if isinstance(stride, int):
-        _stride = list(repeat(stride, dim))
-    elif len(stride) == dim:
-        _stride = stride
-    else:
-        raise ValueError(
-            f"input has {dim} dimensions, while kernel has {len(stride)} dimensions, both not including the channel dimension"
-        )
-
-    if isinstance(padding, int):
-        _padding = list(repeat(padding, dim))
-    elif len(padding) == dim:
-        _padding = padding
-    else:
-        raise ValueError(
-            f"input has {dim} dimensions, while kernel has {len(padding)} dimensions, both not including the channel dimension"
-        )
-
-    if isinstance(output_padding, int):
-        _output_padding = list(repeat(output_padding, dim))
-    elif len(output_padding) == dim:
-        _output_padding = output_padding
-    else:
-        raise ValueError(
-            f"input has {dim} dimensions, while kernel has {len(output_padding)} dimensions, both not including the channel dimension"
-        )
-
-    if isinstance(dilation, int):
-        _dilation = list(repeat(dilation, dim))
-    elif len(dilation) == dim:
-        _dilation = dilation
-    else:
-        raise ValueError(
-            f"input has {dim} dimensions, while kernel has {len(dilation)} dimensions, both not including the channel dimension"
-        )
-
-    if channel_last:
-        _input_shape = list(input_shape[1:-1])
-    else:
-        _input_shape = list(input_shape[2:])
-
-    if lt in [
-        "deconv",
-        "deconvolution",
-        "transposeconv",
-        "transposeconvolution",
-    ]:
+    if category == "deconv":
         output_shape = [
             (i - 1) * s - 2 * p + d * (k - 1) + o + 1
             for i, p, o, d, k, s in zip(
-                _input_shape,
+                spatial,
                 _padding,
                 _output_padding,
                 _dilation,
@@ -272,10 +318,11 @@ def compute_output_shape(
             )
         ]
     else:
+        minus_term = _MINUS_TERMS[category]
         output_shape = [
-            floor(((i + 2 * p - minus_term(d, k)) / s) + 1)
+            (i + 2 * p - minus_term(d, k)) // s + 1
             for i, p, d, k, s in zip(
-                _input_shape, _padding, _dilation, _kernel_size, _stride
+                spatial, _padding, _dilation, _kernel_size, _stride
             )
         ]
     if channel_last:
@@ -494,8 +541,7 @@ def compute_module_size(module: nn.Module) -> int:
     n_params: int,
         size (number of parameters) of this torch module
     """
-    module_parameters = filter(lambda p: p.requires_grad, module.parameters())
-    n_params = sum([np.prod(p.size()) for p in module_parameters])
+    n_params = sum(p.numel() for p in module.parameters() if p.requires_grad)
     return n_params
 
 
@@ -557,23 +603,20 @@ def compute_receptive_field(
     of the 3 branches of the multi-scopic net, using its original hyper-parameters,
     (note the 3 max pooling layers)
     """
-    _kernel_sizes = (
-        [kernel_sizes] if isinstance(kernel_sizes, int) else list(kernel_sizes)
-    )
+    _kernel_sizes = np.atleast_1d(np.asarray(kernel_sizes, dtype=np.int64))
     num_layers = len(_kernel_sizes)
-    _strides = (
-        list(repeat(strides, num_layers)) if isinstance(strides, int) else list(strides)
-    )
-    _dilations = (
-        list(repeat(dilations, num_layers))
-        if isinstance(dilations, int)
-        else list(dilations)
-    )
+    # scalars (python, numpy, etc.) are broadcast to all the layers
+    _strides, _dilations = [
+        np.full(num_layers, v, dtype=np.int64)
+        if np.ndim(v) == 0
+        else np.asarray(v, dtype=np.int64)
+        for v in [strides, dilations]
+    ]
     assert num_layers == len(_strides) == len(_dilations)
-    receptive_field = 1
-    for idx, (k, d) in enumerate(zip(_kernel_sizes, _dilations)):
-        s = np.prod(_strides[:idx]) if idx > 0 else 1
-        receptive_field += d * (k - 1) * s
+    # products of the strides of the previous layers
+    stride_prods = np.ones_like(_strides)
+    np.cumprod(_strides[:-1], out=stride_prods[1:])
+    receptive_field = 1 + int((_dilations * (_kernel_sizes - 1) * stride_prods).sum())
     if input_len is not None:
         receptive_field = min(receptive_field, input_len)
     return receptive_field
@@ -600,11 +643,59 @@ def default_collate_fn(
         the concatenated values as input for training
     labels: Tensor,
         the concatenated labels as ground truth for training
+
+    NOTE: the returned tensors are on CPU and not pinned,
+    pinning is left to `DataLoader` (`pin_memory=True`) in the main process,
+    so that the batches can be moved via `.to(device, non_blocking=True)`
     """
-    values = [[item[0]] for item in batch]
-    labels = [[item[1]] for item in batch]
-    values = np.concatenate(values, axis=0).astype(_DTYPE)
+    # the items are copied (and cast) once, directly into the batch arrays,
+    # `np.stack` raises ValueError if the items are not of the same shape
+    values = np.empty((len(batch),) + np.shape(batch[0][0]), dtype=_DTYPE)
+    labels = np.empty((len(batch),) + np.shape(batch[0][1]), dtype=_DTYPE)
+    np.stack([item[0] for item in batch], out=values)
+    np.stack([item[1] for item in batch], out=labels)
     values = torch.from_numpy(values)
-    labels = np.concatenate(labels, axis=0).astype(_DTYPE)
     labels = torch.from_numpy(labels)
     return values, labels
+
+
+def make_collate_fn(
+    signal_shape: Sequence[int],
+    label_shape: Sequence[int],
+    dtype: type = _DTYPE,
+) -> Callable[[Sequence[Tuple[np.ndarray, np.ndarray]]], Tuple[Tensor, Tensor]]:
+    """finished, checked,
+
+    make a collate function specialized for items of fixed shapes,
+    which behaves the same as `default_collate_fn`,
+    but without inferring the shapes from the first item of each batch,
+    items not of the given shapes are rejected (ValueError raised)
+
+    Parameters
+    ----------
+    signal_shape: sequence of int,
+        shape of the signals (the first element of the items)
+    label_shape: sequence of int,
+        shape of the labels (the second element of the items)
+    dtype: type, default `_DTYPE`,
+        dtype of the output arrays (tensors)
+
+    Returns
+    -------
+    collate_fn: callable,
+        the specialized collate function
+    """
+    signal_shape = tuple(signal_shape)
+    label_shape = tuple(label_shape)
+
+    def collate_fn(
+        batch: Sequence[Tuple[np.ndarray, np.ndarray]]
+    ) -> Tuple[Tensor, Tensor]:
+        values = np.empty((len(batch),) + signal_shape, dtype=dtype)
+        labels = np.empty((len(batch),) + label_shape, dtype=dtype)
+        # `np.stack` raises ValueError if some item is not of the given shape
+        np.stack([item[0] for item in batch], out=values)
+        np.stack([item[1] for item in batch], out=labels)
+        return torch.from_numpy(values), torch.from_numpy(labels)
+
+    return collate_fn
@@ -741,9 +741,11 @@ def ensure_lead_fmt(
     Returns
     -------
     out_values: ndarray,
-        ECG signal in the format of `fmt`
+        ECG signal in the format of `fmt`,
+        NOTE that it may share memory with `values` (no copy is made if `values` is an ndarray),
+        copy it explicitly if it is to be modified in place
     """
-    out_values = np.array(values)
+    out_values = np.asarray(values)
     lead_dim = np.where(np.array(out_values.shape) == n_leads)[0]
     if not any([[0] == lead_dim or [1] == lead_dim]):
         raise ValueError(f"not valid {n_leads}-lead signal")